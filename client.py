@@ -1,4 +1,5 @@
 import socket
+import struct
 import sys
 
 # Constants
@@ -6,6 +7,20 @@ MAGIC_NUM = 0x36FB
 REQUEST_DATE = 0x0001
 REQUEST_TIME = 0x0002
 
+# Magic number, packet type and request type of a DT-Request
+_REQ_STRUCT = struct.Struct('>HHH')
+# Fixed 13 byte header of a DT-Response
+_RESP_STRUCT = struct.Struct('>HHHHBBBBB')
+# Magic number followed by the DT-Response packet type
+_RESP_PREFIX = b'\x36\xfb\x00\x02'
+
+_VALID_LANGS = frozenset((0x0001, 0x0002, 0x0003))
+_LANG_NAMES = {
+    0x0001: "English",
+    0x0002: "Māori",
+    0x0003: "German"
+}
+
 class Client:
     def __init__(self, args):
         self.args = args
@@ -14,6 +29,7 @@ class Client:
         self.port = None
         self.sock = None
         self.address = None
+        self._rxbuf = bytearray(2048)
 
     def check_number_of_arguments(self):
         """Ensure there are exactly 3 arguments (excluding script name)"""
@@ -56,10 +72,7 @@ class Client:
         except OSError:
             sys.exit(f"ERROR: Socket creation failed")
         
-        packet = bytearray()
-        packet.extend(MAGIC_NUM.to_bytes(2, 'big'))
-        packet.extend(0x0001.to_bytes(2, 'big')) 
-        packet.extend(self.request_type.to_bytes(2, 'big'))
+        packet = _REQ_STRUCT.pack(MAGIC_NUM, 0x0001, self.request_type)
         
         try:
             self.sock.sendto(packet, self.address)
@@ -75,7 +88,7 @@ class Client:
         """Receive the server response and process it"""
         self.sock.settimeout(1)
         try:
-            received_packet, _ = self.sock.recvfrom(1024)
+            n, _ = self.sock.recvfrom_into(self._rxbuf, 2048)
         except socket.timeout:
             sys.exit("ERROR: Receiving timed out")
         except socket.error:
@@ -83,57 +96,45 @@ class Client:
         finally:
             self.sock.close()
         
-        self.process_packet(received_packet)
+        self.process_packet(memoryview(self._rxbuf)[:n])
 
     def process_packet(self, received_packet):
         """Process the server's response packet"""
         if len(received_packet) < 13:
             sys.exit("ERROR: Packet is too small to be a DT_Response")
 
-        magic_no = int.from_bytes(received_packet[0:2], 'big')
-        packet_type = int.from_bytes(received_packet[2:4], 'big')
-        language_type = int.from_bytes(received_packet[4:6], 'big')
-        year = int.from_bytes(received_packet[6:8], 'big')
-        month = received_packet[8]
-        day = received_packet[9]
-        hour = received_packet[10]
-        minute = received_packet[11]
-        length = received_packet[12]
-
-        if magic_no != MAGIC_NUM:
-            sys.exit("ERROR: Packet magic number is incorrect")
-        elif packet_type != 0x0002:
+        fields = _RESP_STRUCT.unpack_from(received_packet)
+        magic_no, packet_type, language_type, year, month, day, hour, minute, length = fields
+
+        if received_packet[:4] != _RESP_PREFIX:
+            if magic_no != MAGIC_NUM:
+                sys.exit("ERROR: Packet magic number is incorrect")
             sys.exit("ERROR: Packet is not a DT_Response")
-        elif language_type not in (0x0001, 0x0002, 0x0003):
+        if len(received_packet) != 13 + length:
+            sys.exit("ERROR: Packet text length is incorrect")
+        if language_type not in _VALID_LANGS:
             sys.exit("ERROR: Packet has invalid language")
-        elif year > 2100:
+        if year > 2100:
             sys.exit("ERROR: Packet has invalid year")
-        elif month < 1 or month > 12:
-            sys.exit("ERROR: Packet has invalid month")
-        elif day < 1 or day > 31:
-            sys.exit("ERROR: Packet has invalid day")
-        elif hour < 0 or hour > 23:
-            sys.exit("ERROR: Packet has invalid hour")
-        elif minute < 0 or minute > 59:
+        # Hour and minute are unsigned bytes, so their '< 0' checks were dropped
+        if not (1 <= month <= 12 and 1 <= day <= 31 and hour <= 23 and minute <= 59):
+            if not 1 <= month <= 12:
+                sys.exit("ERROR: Packet has invalid month")
+            if not 1 <= day <= 31:
+                sys.exit("ERROR: Packet has invalid day")
+            if hour > 23:
+                sys.exit("ERROR: Packet has invalid hour")
             sys.exit("ERROR: Packet has invalid minute")
-        elif len(received_packet) != 13 + length:
-            sys.exit("ERROR: Packet text length is incorrect")
 
-        self.print_packet_stuff(received_packet)
+        self.print_packet_stuff(fields, memoryview(received_packet)[13:13 + length])
 
-    def print_packet_stuff(self, received_packet):
-        magic_no = int.from_bytes(received_packet[0:2], 'big')
-        packet_type = int.from_bytes(received_packet[2:4], 'big')
-        language_type = int.from_bytes(received_packet[4:6], 'big')
-        year = int.from_bytes(received_packet[6:8], 'big')
-        month = received_packet[8]
-        day = received_packet[9]
-        hour = received_packet[10]
-        minute = received_packet[11]
-        length = received_packet[12]
+    def print_packet_stuff(self, fields, text_bytes):
+        """Print a validated response using its already unpacked header fields"""
+        _, _, language_type, year, month, day, hour, minute, _ = fields
 
         try:
-            text = received_packet[13:].decode('utf-8')
+            # str() decodes straight from the buffer, no intermediate bytes copy
+            text = str(text_bytes, 'utf-8')
         except UnicodeDecodeError:
             sys.exit("ERROR: Packet has invalid text")
             
@@ -144,12 +145,7 @@ class Client:
 
     def language_select(self, language_type):
         """Convert language type to human-readable format"""
-        languages = {
-            0x0001: "English",
-            0x0002: "Māori",
-            0x0003: "German"
-        }
-        return languages.get(language_type)
+        return _LANG_NAMES.get(language_type)
     
 def main():
     client = Client(sys.argv)
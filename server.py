@@ -1,13 +1,29 @@
+import asyncio
 import socket
+import struct
 import sys
-from select import select
 import datetime
+import time
 
 # Constants
 MAGIC_NUM = 0x36FB
 REQUEST_DATE = 0x0001
 REQUEST_TIME = 0x0002
 
+# Year, month, day, hour, minute and text length of a DT-Response
+_RESP_STRUCT = struct.Struct('>HBBBBB')
+# Magic number, packet type and request type of a DT-Request
+_REQ_STRUCT = struct.Struct('>HHH')
+_VALID_REQ_TYPES = frozenset((REQUEST_DATE, REQUEST_TIME))
+# Magic number followed by the DT-Response packet type
+_RESP_PREFIX = b'\x36\xfb\x00\x02'
+# Languages are passed around as indices into these tuples
+ENGLISH, MAORI, GERMAN = 0, 1, 2
+LANGUAGES = ('English', 'Māori', 'German')
+_LANG_CODES = (0x0001, 0x0002, 0x0003)
+# How long, in seconds, a read of the clock is reused across responses
+_DT_CACHE_SECONDS = 0.2
+
 # Month names in different languages
 MONTH_NAMES = {
     'English': ["January", "February", "March", "April", "May", "June",
@@ -19,37 +35,60 @@ MONTH_NAMES = {
                "Juli", "August", "September", "Oktober", "November", "Dezember"]
 }
 
-def tell_it_what_it_is(date_time, language, request_type):
-    """Creates a representation of the date or time based on language selected"""
-    month = MONTH_NAMES[language][date_time.month - 1]
-    day = date_time.day
-    year = date_time.year
-    hour = date_time.hour
-    minute = date_time.minute
-
-    if request_type == REQUEST_DATE:
-        if language == 'English':
-            return f"Today's date is {month} {day}, {year}"
-        elif language == 'Māori':
-            return f"Ko te rā o tēnei rā ko {month} {day}, {year}"
-        elif language == 'German':
-            return f"Heute ist der {day}. {month} {year}"
-    if request_type == REQUEST_TIME:
-        if language == 'English':
-            return f"The current time is {hour:02}:{minute:02}"
-        elif language == 'Māori':
-            return f"Ko te wā o tēnei wā {hour:02}:{minute:02}"
-        elif language == 'German':
-            return f"Die Uhrzeit ist {hour:02}:{minute:02}"
+# Month names pre-encoded so responses can be built straight into bytes, indexed by language
+_MONTHS = tuple(tuple(month.encode('utf-8') for month in MONTH_NAMES[lang]) for lang in LANGUAGES)
+
+# Complete response templates, pre-encoded so each response is a single bytes format
+EN_DATE = "Today's date is %b %d, %d".encode('utf-8')
+MA_DATE = "Ko te rā o tēnei rā ko %b %d, %d".encode('utf-8')
+GER_DATE = "Heute ist der %d. %b %d".encode('utf-8')
+EN_TIME = "The current time is %02d:%02d".encode('utf-8')
+MA_TIME = "Ko te wā o tēnei wā %02d:%02d".encode('utf-8')
+GER_TIME = "Die Uhrzeit ist %02d:%02d".encode('utf-8')
+
+# Text builders for every (language, request type) pair
+RESPONDERS = {
+    (ENGLISH, REQUEST_DATE): lambda y, mo, d, h, mi: EN_DATE % (_MONTHS[ENGLISH][mo - 1], d, y),
+    (MAORI, REQUEST_DATE): lambda y, mo, d, h, mi: MA_DATE % (_MONTHS[MAORI][mo - 1], d, y),
+    (GERMAN, REQUEST_DATE): lambda y, mo, d, h, mi: GER_DATE % (d, _MONTHS[GERMAN][mo - 1], y),
+    (ENGLISH, REQUEST_TIME): lambda y, mo, d, h, mi: EN_TIME % (h, mi),
+    (MAORI, REQUEST_TIME): lambda y, mo, d, h, mi: MA_TIME % (h, mi),
+    (GERMAN, REQUEST_TIME): lambda y, mo, d, h, mi: GER_TIME % (h, mi)
+}
+
+def tell_it_what_it_is(y, mo, d, h, mi, lang_idx, request_type):
+    """Creates a UTF-8 encoded representation of the date or time based on language selected"""
+    return RESPONDERS[(lang_idx, request_type)](y, mo, d, h, mi)
+
+def valid_dt_request(packet):
+    """Validate the DT-Request packet, returning its request type or None if invalid."""
+    if len(packet) != 6:
+        print("ERROR: Packet length incorrect for a DT_Request, dropping packet")
+        return None
+
+    magic_num, packet_type, request_type = _REQ_STRUCT.unpack_from(packet)
+    if magic_num != MAGIC_NUM:
+        print("ERROR: Packet magic number is incorrect, dropping packet")
+        return None
+
+    if packet_type != 0x0001:
+        print("ERROR: Packet is not a DT_Request, dropping packet")
+        return None
+
+    if request_type not in _VALID_REQ_TYPES:
+        print("ERROR: Packet has invalid type, dropping packet")
+        return None
+
+    return request_type
 
 class Server:
     def __init__(self, ports):
         """Initialize server with given ports."""
         self.ports = ports
         self.sockets = []
-        self.ensock = None
-        self.masock = None
-        self.gersock = None
+        self.socks = []
+        self.lang_headers = []
+        self._dt_cache = (0.0, None)
 
     def check_number_of_arguments(self):
         """Ensure exactly 3 ports are provided."""
@@ -76,38 +115,33 @@ class Server:
 
     def open_and_bind_socket(self):
         """Create and bind sockets for each language."""
-        try:
-            print(f"Binding English to port {self.ports[0]}")
-            self.ensock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            try:
-                self.sockets.append(self.ensock)
-                self.ensock.bind(("localhost", self.ports[0]))
-            except:
-                self.close_sockets()
-                sys.exit("ERROR: Socket binding failed")
-    
-            print(f"Binding Māori to port {self.ports[1]}")
-            self.masock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for lang_idx, port in enumerate(self.ports):
+            print(f"Binding {LANGUAGES[lang_idx]} to port {port}")
             try:
-                self.sockets.append(self.masock)
-                self.masock.bind(("localhost", self.ports[1]))
-            except:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            except socket.error:
                 self.close_sockets()
-                sys.exit("ERROR: Socket binding failed")
+                sys.exit("ERROR: Socket creation failed")
 
-            print(f"Binding German to port {self.ports[2]}")
-            self.gersock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             try:
-                self.sockets.append(self.gersock)
-                self.gersock.bind(("localhost", self.ports[2]))
-            
-            except:
+                self.sockets.append(sock)
+                self.set_socket_options(sock)
+                sock.bind(("localhost", port))
+                sock.setblocking(False)
+            except socket.error:
                 self.close_sockets()
                 sys.exit("ERROR: Socket binding failed")
-                
-        except socket.error:
-            self.close_sockets()
-            sys.exit("ERROR: Socket creation failed")
+
+            self.socks.append(sock)
+            # Magic number, packet type and language code never change per socket
+            self.lang_headers.append(_RESP_PREFIX + _LANG_CODES[lang_idx].to_bytes(2, 'big'))
+
+    def set_socket_options(self, sock):
+        """Allow fast restarts, several server processes per port and larger bursts."""
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
 
     def close_sockets(self):
         """Close all open sockets."""
@@ -116,114 +150,71 @@ class Server:
         self.sockets = []
 
     def waiting_for_request(self):
-        """Handle incoming requests in an infinite loop."""
-        
+        """Handle incoming requests until the server is stopped."""
         try:
-            while True:
-                print("Waiting for requests...")
-                readable, _, _ = select(self.sockets, [], [])
-                if not readable:
-                    continue
-
-                for sock in readable:
-                    try:
-                        data, address = sock.recvfrom(1024)
-                        if not self.valid_dt_request(data):
-                            continue
-
-                        language = self.get_language(sock)
-                        #print(data)
-                        request_type = (data[4] << 8) + data[5]
-                        
-                        print(f"{language} received {'date' if request_type == REQUEST_DATE else 'time'} request from {address[0]}")
-                        
-                        response = self.create_response(language, request_type)
-                        if len(response) >= 255:
-                            sys.exit("ERROR: Text too long, dropping packet")
-
-                        try:
-                            sock.sendto(response, address)
-                            print("Response sent")
-                        except socket.error:
-                            print("ERROR: Sending failed, dropping packet")
-                            continue
-                            
-                    except socket.timeout:
-                        print("ERROR: Receiving timed out, dropping packet")
-                        continue
-                    
-                    except socket.error:
-                        print("ERROR: Receiving failed, dropping packet")
-                        continue
-
+            asyncio.run(self.serve())
         except Exception as error:
             self.close_sockets()
             sys.exit(f"ERROR: {error}")
         finally:
             self.close_sockets()
-            
-
-    def create_response(self, language, request_type):
-        """Create a response based on the request type"""
-        current_time = datetime.datetime.now()
-        textual_representation = tell_it_what_it_is(current_time, language, request_type)
-
-        response = bytearray()
-
-        magic_no = MAGIC_NUM
-        packet_type = 0x0002  # DT-Response
-        lang_code = 0x0001 if language == 'English' else 0x0002 if language == 'Māori' else 0x0003
-        year = current_time.year
-        month = current_time.month
-        day = current_time.day
-        hour = current_time.hour
-        minute = current_time.minute
-        length = len(textual_representation.encode('utf-8'))  # Ensure length is based on utf-8 encoding
-
-        response.extend(magic_no.to_bytes(2, 'big'))
-        response.extend(packet_type.to_bytes(2, 'big'))
-        response.extend(lang_code.to_bytes(2, 'big'))
-        response.extend(year.to_bytes(2, 'big'))
-        response.extend(month.to_bytes(1, 'big'))
-        response.extend(day.to_bytes(1, 'big'))
-        response.extend(hour.to_bytes(1, 'big'))
-        response.extend(minute.to_bytes(1, 'big'))
-        response.extend(length.to_bytes(1, 'big'))
-        response.extend(textual_representation.encode('utf-8'))  # Use utf-8 encoding
-        
-        return response
 
-    def valid_dt_request(self, packet):
-        """Validate the DT-Request packet."""
-        if len(packet) != 6:
-            print("ERROR: Packet length incorrect for a DT_Request, dropping packet")
-            return False
-        
-        magic_num = (packet[0] << 8) + packet[1]
-        if magic_num != MAGIC_NUM:
-            print("ERROR: Packet magic number is incorrect, dropping packet")
-            return False
-        
-        packet_type = (packet[2] << 8) + packet[3]
-        if packet_type != 0x0001:
-            print("ERROR: Packet is not a DT_Request, dropping packet")
-            return False
-
-        request_type = (packet[4] << 8) + packet[5]
-        if request_type not in (REQUEST_DATE, REQUEST_TIME):
-            print("ERROR: Packet has invalid type, dropping packet")
-            return False
-        
-        return True
-
-    def get_language(self, sock):
-        """Determine the language based on the socket."""
-        if sock == self.ensock:
-            return 'English'
-        elif sock == self.masock:
-            return 'Māori'
-        elif sock == self.gersock:
-            return 'German'
+    async def serve(self):
+        """Attach a datagram endpoint to every bound socket and run forever."""
+        loop = asyncio.get_running_loop()
+        for lang_idx, sock in enumerate(self.socks):
+            await loop.create_datagram_endpoint(
+                lambda lang_idx=lang_idx: LanguageProtocol(self, lang_idx), sock=sock)
+        print("Waiting for requests...")
+        await loop.create_future()
+
+    def handle_request(self, transport, lang_idx, data, address):
+        """Answer a single datagram received on the given language's socket."""
+        request_type = valid_dt_request(data)
+        if request_type is None:
+            return
+
+        print(f"{LANGUAGES[lang_idx]} received {'date' if request_type == REQUEST_DATE else 'time'} request from {address[0]}")
+
+        response = self.create_response(lang_idx, request_type)
+        if response is None:
+            print("ERROR: Text too long, dropping packet")
+            return
+
+        # Send failures never raise here, the transport reports them through error_received
+        transport.sendto(response, address)
+        print("Response sent")
+
+    def create_response(self, lang_idx, request_type):
+        """Create a response based on the request type, or None if the text does not fit."""
+        t = time.monotonic()
+        if self._dt_cache[1] is None or t - self._dt_cache[0] > _DT_CACHE_SECONDS:
+            self._dt_cache = (t, datetime.datetime.now())
+        now = self._dt_cache[1]
+        y, mo, d, h, mi = now.year, now.month, now.day, now.hour, now.minute
+        text = tell_it_what_it_is(y, mo, d, h, mi, lang_idx, request_type)
+        # The length field is a single byte
+        if len(text) > 255:
+            return None
+
+        return self.lang_headers[lang_idx] + _RESP_STRUCT.pack(y, mo, d, h, mi, len(text)) + text
+
+class LanguageProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint answering requests for one language."""
+    def __init__(self, server, lang_idx):
+        self.server = server
+        self.lang_idx = lang_idx
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.server.handle_request(self.transport, self.lang_idx, data, address)
+
+    def error_received(self, error):
+        # The transport reports both failed receives and failed sends here
+        print(f"ERROR: Sending or receiving failed ({error}), dropping packet")
 
 def main():
     """Main function to start the server."""